@@ -0,0 +1,321 @@
+# backend/jobs.py
+# pyright: reportMissingImports=false
+"""
+Shared scan job queue. API nodes enqueue jobs; workers claim them under a
+lease, heartbeat to keep it, and jobs whose lease expires are retried
+"""
+import json
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+# Only needed for redis:// queues
+try:
+    import redis
+except ImportError:
+    redis = None
+
+JOB_LEASE_SECONDS = 60
+JOB_MAX_ATTEMPTS = 3
+
+class JobQueue(ABC):
+    """Interface every queue backend implements"""
+
+    @classmethod
+    def from_url(cls, url: str) -> "JobQueue":
+        return cls(url)
+
+    @abstractmethod
+    def enqueue(self, payload: Dict) -> str:
+        ...
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[Dict]:
+        """Take the oldest queued job, or one whose worker stopped heartbeating"""
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        """Extend the lease; False means the job was reclaimed and the worker should drop it"""
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Dict) -> bool:
+        ...
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """Requeue the job if attempts remain and retry is set, otherwise mark it failed"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        ...
+
+class SQLiteJobQueue(JobQueue):
+    """Queue in a SQLite file; fine for any number of workers on one machine"""
+
+    def __init__(self, path: str, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                payload TEXT,
+                status TEXT,
+                attempts INTEGER DEFAULT 0,
+                worker_id TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                created_at REAL,
+                updated_at REAL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        conn.close()
+
+    @classmethod
+    def from_url(cls, url: str) -> "SQLiteJobQueue":
+        # sqlite:///jobs.db -> jobs.db, sqlite:////abs/jobs.db -> /abs/jobs.db
+        location = url.partition("://")[2]
+        if location.startswith("/"):
+            location = location[1:]
+        return cls(location)
+
+    def _connect(self):
+        # Autocommit mode so claim() can take the write lock explicitly
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, payload: Dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO jobs (id, payload, status, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?)",
+            (job_id, json.dumps(payload), now, now)
+        )
+        conn.close()
+        return job_id
+
+    def claim(self, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[Dict]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Workers that died on their last allowed attempt leave the job failed, not requeued
+            conn.execute(
+                """UPDATE jobs SET status = 'failed', error = 'Worker lease expired', updated_at = ?
+                   WHERE status = 'running' AND lease_expires < ? AND attempts >= ?""",
+                (now, now, self.max_attempts)
+            )
+            row = conn.execute(
+                """SELECT * FROM jobs
+                   WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?)
+                   ORDER BY created_at LIMIT 1""",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                """UPDATE jobs SET status = 'running', worker_id = ?, attempts = attempts + 1,
+                   lease_expires = ?, updated_at = ? WHERE id = ?""",
+                (worker_id, now + lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return {"id": row["id"], "payload": json.loads(row["payload"]), "attempts": row["attempts"] + 1}
+
+    def _update_running(self, job_id: str, worker_id: str, sql: str, params: tuple) -> bool:
+        """Apply an update only while this worker still holds the job"""
+        conn = self._connect()
+        cur = conn.execute(
+            f"UPDATE jobs SET {sql}, updated_at = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+            params + (time.time(), job_id, worker_id)
+        )
+        conn.close()
+        return cur.rowcount == 1
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        return self._update_running(job_id, worker_id, "lease_expires = ?", (time.time() + lease_seconds,))
+
+    def complete(self, job_id: str, worker_id: str, result: Dict) -> bool:
+        return self._update_running(
+            job_id, worker_id, "status = 'done', result = ?, error = NULL", (json.dumps(result),)
+        )
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        job = self.get(job_id)
+        if job is None:
+            return False
+        if retry and job["attempts"] < self.max_attempts:
+            return self._update_running(
+                job_id, worker_id, "status = 'queued', worker_id = NULL, lease_expires = NULL, error = ?", (error,)
+            )
+        return self._update_running(job_id, worker_id, "status = 'failed', error = ?", (error,))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "error": row["error"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+# Requeue expired leases (or fail them on their last attempt), then pop the oldest queued job.
+# Queued jobs are scored by created_at, so a retried job keeps its place like in SQLite.
+_REDIS_CLAIM = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', '(' .. ARGV[1])
+for _, id in ipairs(expired) do
+    local key = ARGV[5] .. id
+    redis.call('ZREM', KEYS[2], id)
+    if tonumber(redis.call('HGET', key, 'attempts')) >= tonumber(ARGV[4]) then
+        redis.call('HSET', key, 'status', 'failed', 'error', 'Worker lease expired', 'updated_at', ARGV[1])
+    else
+        redis.call('HSET', key, 'status', 'queued', 'updated_at', ARGV[1])
+        redis.call('HDEL', key, 'worker_id')
+        redis.call('ZADD', KEYS[1], redis.call('HGET', key, 'created_at'), id)
+    end
+end
+local popped = redis.call('ZPOPMIN', KEYS[1])
+if #popped == 0 then
+    return false
+end
+local id = popped[1]
+local key = ARGV[5] .. id
+local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+redis.call('HSET', key, 'status', 'running', 'worker_id', ARGV[2], 'lease_expires', ARGV[3], 'updated_at', ARGV[1])
+redis.call('ZADD', KEYS[2], ARGV[3], id)
+return {id, redis.call('HGET', key, 'payload'), attempts}
+"""
+
+# Counterpart of SQLiteJobQueue._update_running: only the worker holding the job may change it
+_REDIS_UPDATE_RUNNING = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'running' or redis.call('HGET', KEYS[1], 'worker_id') ~= ARGV[2] then
+    return 0
+end
+local action = ARGV[4]
+if action == 'lease' then
+    redis.call('HSET', KEYS[1], 'lease_expires', ARGV[5], 'updated_at', ARGV[3])
+    redis.call('ZADD', KEYS[2], ARGV[5], ARGV[1])
+    return 1
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+if action == 'done' then
+    redis.call('HSET', KEYS[1], 'status', 'done', 'result', ARGV[5], 'updated_at', ARGV[3])
+    redis.call('HDEL', KEYS[1], 'error')
+elseif action == 'queued' then
+    redis.call('HSET', KEYS[1], 'status', 'queued', 'error', ARGV[5], 'updated_at', ARGV[3])
+    redis.call('HDEL', KEYS[1], 'worker_id', 'lease_expires')
+    redis.call('ZADD', KEYS[3], redis.call('HGET', KEYS[1], 'created_at'), ARGV[1])
+else
+    redis.call('HSET', KEYS[1], 'status', 'failed', 'error', ARGV[5], 'updated_at', ARGV[3])
+end
+return 1
+"""
+
+class RedisJobQueue(JobQueue):
+    """Queue in Redis (or a compatible server); API nodes and workers may run on different machines"""
+
+    # The {jobs} hash tag keeps every key in one Redis Cluster slot, which the Lua scripts need
+    def __init__(self, url: str, max_attempts: int = JOB_MAX_ATTEMPTS, prefix: str = "mobipent:{jobs}"):
+        if redis is None:
+            raise RuntimeError("redis:// job queues need the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.max_attempts = max_attempts
+        self.queued_key = f"{prefix}:queued"
+        self.running_key = f"{prefix}:running"
+        self.job_prefix = f"{prefix}:job:"
+        self._claim = self.client.register_script(_REDIS_CLAIM)
+        self._update = self.client.register_script(_REDIS_UPDATE_RUNNING)
+
+    def enqueue(self, payload: Dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(self.job_prefix + job_id, mapping={
+            "payload": json.dumps(payload),
+            "status": "queued",
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        })
+        pipe.zadd(self.queued_key, {job_id: now})
+        pipe.execute()
+        return job_id
+
+    def claim(self, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[Dict]:
+        now = time.time()
+        claimed = self._claim(
+            keys=[self.queued_key, self.running_key],
+            args=[repr(now), worker_id, repr(now + lease_seconds), self.max_attempts, self.job_prefix]
+        )
+        if not claimed:
+            return None
+        job_id, payload, attempts = claimed
+        return {"id": job_id, "payload": json.loads(payload), "attempts": int(attempts)}
+
+    def _update_running(self, job_id: str, worker_id: str, action: str, value: str) -> bool:
+        """Apply an update only while this worker still holds the job"""
+        return self._update(
+            keys=[self.job_prefix + job_id, self.running_key, self.queued_key],
+            args=[job_id, worker_id, repr(time.time()), action, value]
+        ) == 1
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        return self._update_running(job_id, worker_id, "lease", repr(time.time() + lease_seconds))
+
+    def complete(self, job_id: str, worker_id: str, result: Dict) -> bool:
+        return self._update_running(job_id, worker_id, "done", json.dumps(result))
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        job = self.get(job_id)
+        if job is None:
+            return False
+        if retry and job["attempts"] < self.max_attempts:
+            return self._update_running(job_id, worker_id, "queued", error)
+        return self._update_running(job_id, worker_id, "failed", error)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self.client.hgetall(self.job_prefix + job_id)
+        if not row:
+            return None
+        return {
+            "job_id": job_id,
+            "status": row["status"],
+            "attempts": int(row["attempts"]),
+            "error": row.get("error"),
+            "result": json.loads(row["result"]) if row.get("result") else None,
+            "created_at": float(row["created_at"]),
+            "updated_at": float(row["updated_at"]),
+        }
+
+# URL scheme -> backend; register other implementations here
+QUEUE_BACKENDS = {
+    "sqlite": SQLiteJobQueue,
+    "redis": RedisJobQueue,
+    "rediss": RedisJobQueue,
+}
+
+def open_queue(url: str) -> JobQueue:
+    """Open a queue from a URL such as sqlite:///jobs.db or redis://host:6379/0"""
+    scheme, sep, _ = url.partition("://")
+    if not sep or scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"Unsupported job queue URL: {url}")
+    return QUEUE_BACKENDS[scheme].from_url(url)
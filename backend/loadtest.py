@@ -0,0 +1,358 @@
+# backend/loadtest.py
+"""
+End-to-end load test for the MobiPent API.
+
+Starts the app in a subprocess with a stub extractor that writes a synthetic
+decompiled tree, drives it with concurrent clients and writes a JSON report:
+
+    python loadtest.py --clients 8 --duration 60 --mix comprehensive=2,tool=3,login=5
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+LOADTEST_EMAIL = "loadtest@mobipent.local"
+LOADTEST_PASSWORD = "loadtest"
+
+SYNTHETIC_MANIFEST = """<?xml version="1.0" encoding="utf-8"?>
+<manifest xmlns:android="http://schemas.android.com/apk/res/android" package="com.mobipent.loadtest">
+    <uses-permission android:name="android.permission.CAMERA"/>
+    <application android:allowBackup="true" android:debuggable="true">
+        <activity android:name=".MainActivity" android:exported="true"/>
+    </application>
+</manifest>
+"""
+
+# Lines mixing matches for every analyzer with plain filler
+SYNTHETIC_SMALI_LINES = [
+    '    const-string v0, "http://api.example.com/v1/users"',
+    '    invoke-static {v0}, Landroid/util/Log;->d(Ljava/lang/String;)I',
+    '    const-string v1, "MD5"',
+    '    const-string v2, "AES_KEY = \'0123456789abcdef0123\'"',
+    '    invoke-virtual {v3}, Landroid/telephony/TelephonyManager;->getDeviceId()Ljava/lang/String;',
+    '    const-string v4, "/system/xbin/su"',
+    '    move-result-object v5',
+    '    iget-object v6, p0, Lcom/mobipent/loadtest/Main;->field:Ljava/lang/String;',
+    '    return-void',
+]
+
+# === Server side ===
+def write_synthetic_tree(output_dir: str, smali_files: int, smali_lines: int, seed: str):
+    """Stand-in for apktool: a decompiled tree shaped like a real app"""
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(output_dir, "res", "xml"), exist_ok=True)
+    with open(os.path.join(output_dir, "AndroidManifest.xml"), "w") as f:
+        f.write(SYNTHETIC_MANIFEST)
+    with open(os.path.join(output_dir, "res", "xml", "network_security_config.xml"), "w") as f:
+        f.write('<network-security-config><base-config cleartextTrafficPermitted="true"/></network-security-config>')
+
+    for index in range(smali_files):
+        package_dir = os.path.join(output_dir, "smali", "com", "mobipent", f"p{index % 20}")
+        os.makedirs(package_dir, exist_ok=True)
+        # Mix short (obfuscated-looking) and descriptive class names
+        name = f"a{index}" if index % 2 else f"LoadTestClass{index}"
+        with open(os.path.join(package_dir, f"{name}.smali"), "w") as f:
+            f.write(f".class public L{name};\n.super Ljava/lang/Object;\n")
+            f.write("\n".join(rng.choice(SYNTHETIC_SMALI_LINES) for _ in range(smali_lines)))
+
+def serve(port: int, smali_files: int, smali_lines: int):
+    """Run the app with extract_apk replaced by the synthetic tree writer"""
+    sys.path.insert(0, BACKEND_DIR)
+    import uvicorn
+    import main
+    import scanner
+
+    def stub_extract_apk(self) -> bool:
+        write_synthetic_tree(self.output_dir, smali_files, smali_lines, seed=os.path.basename(self.apk_path))
+        return True
+
+    scanner.OWASPMobileScanner.extract_apk = stub_extract_apk
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+# === Resource sampling ===
+def sample_process(pid: int) -> Optional[Dict[str, float]]:
+    """Return RSS in MB and total CPU seconds, via psutil or /proc"""
+    try:
+        import psutil
+        proc = psutil.Process(pid)
+        cpu = proc.cpu_times()
+        return {"rss_mb": proc.memory_info().rss / (1024 * 1024), "cpu_seconds": cpu.user + cpu.system}
+    except ImportError:
+        pass
+    except Exception:
+        return None
+
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        return {
+            "rss_mb": int(fields[21]) * page_size / (1024 * 1024),
+            "cpu_seconds": (int(fields[11]) + int(fields[12])) / ticks,
+        }
+    except (OSError, ValueError, IndexError):
+        return None
+
+class ResourceMonitor(threading.Thread):
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            sample = sample_process(self.pid)
+            if sample:
+                sample["time"] = time.monotonic()
+                self.samples.append(sample)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def summary(self) -> Dict:
+        if len(self.samples) < 2:
+            return {"available": False}
+        rss = [s["rss_mb"] for s in self.samples]
+        elapsed = self.samples[-1]["time"] - self.samples[0]["time"]
+        cpu = self.samples[-1]["cpu_seconds"] - self.samples[0]["cpu_seconds"]
+        return {
+            "available": True,
+            "rss_mb_max": round(max(rss), 1),
+            "rss_mb_mean": round(sum(rss) / len(rss), 1),
+            "cpu_percent_mean": round(100 * cpu / elapsed, 1) if elapsed else 0.0,
+        }
+
+# === Client side ===
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ("comprehensive", "tool", "login"):
+            raise argparse.ArgumentTypeError(f"Unknown operation in mix: {name}")
+        try:
+            mix[name] = int(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid weight for {name}: {weight}")
+        if mix[name] < 0:
+            raise argparse.ArgumentTypeError(f"Negative weight for {name}: {weight}")
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("At least one operation needs a positive weight")
+    return mix
+
+class LoadClient:
+    def __init__(self, base_url: str, apk_bytes: bytes, tool_name: str, timeout: float):
+        self.base_url = base_url
+        self.apk_bytes = apk_bytes
+        self.tool_name = tool_name
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def request(self, operation: str, request_id: str) -> requests.Response:
+        if operation == "login":
+            return self.session.post(
+                f"{self.base_url}/auth/login",
+                json={"email": LOADTEST_EMAIL, "password": LOADTEST_PASSWORD},
+                timeout=self.timeout,
+            )
+        # Unique names so concurrent scans don't share an upload or analysis directory
+        files = {"file": (f"loadtest_{request_id}.apk", self.apk_bytes, "application/vnd.android.package-archive")}
+        if operation == "comprehensive":
+            return self.session.post(f"{self.base_url}/analyze/comprehensive", files=files, timeout=self.timeout)
+        return self.session.post(
+            f"{self.base_url}/analyze/tool",
+            data={"tool_name": self.tool_name},
+            files=files,
+            timeout=self.timeout,
+        )
+
+def run_client(client_id: int, client: LoadClient, mix: Dict[str, int], deadline: float, results: List[Dict]):
+    rng = random.Random(client_id)
+    operations = list(mix)
+    weights = [mix[name] for name in operations]
+    count = 0
+    while time.monotonic() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = client.request(operation, f"{client_id}_{count}")
+            ok = response.status_code == 200
+            status = response.status_code
+        except requests.RequestException as e:
+            ok = False
+            status = type(e).__name__
+        results.append({
+            "operation": operation,
+            "latency_ms": (time.perf_counter() - started) * 1000,
+            "ok": ok,
+            "status": status,
+        })
+        count += 1
+
+def summarize(results: List[Dict], elapsed: float) -> Dict:
+    report = {}
+    for operation in sorted({r["operation"] for r in results}):
+        rows = [r for r in results if r["operation"] == operation]
+        latencies = [r["latency_ms"] for r in rows if r["ok"]]
+        errors = [r for r in rows if not r["ok"]]
+        statuses: Dict[str, int] = {}
+        for r in errors:
+            statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+        report[operation] = {
+            "requests": len(rows),
+            "errors": len(errors),
+            "error_rate": round(len(errors) / len(rows), 4),
+            "error_statuses": statuses,
+            "throughput_per_second": round(len(rows) / elapsed, 3),
+            "latency_ms": {
+                "p50": _round(percentile(latencies, 50)),
+                "p95": _round(percentile(latencies, 95)),
+                "p99": _round(percentile(latencies, 99)),
+                "max": _round(max(latencies) if latencies else None),
+            },
+        }
+    scans = sum(1 for r in results if r["ok"] and r["operation"] in ("comprehensive", "tool"))
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "total_requests": len(results),
+        "scans_per_minute": round(scans / elapsed * 60, 2),
+        "operations": report,
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start within {timeout}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="MobiPent end-to-end load test")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="test length in seconds")
+    parser.add_argument("--mix", type=parse_mix, default="comprehensive=2,tool=3,login=5",
+                        help="operation weights, e.g. comprehensive=2,tool=3,login=5")
+    parser.add_argument("--tool", default="Crypto Analysis", help="tool_name for /analyze/tool")
+    parser.add_argument("--apk", help="APK to upload; random bytes are used if omitted")
+    parser.add_argument("--apk-size-kb", type=int, default=512, help="size of the random APK payload")
+    parser.add_argument("--smali-files", type=int, default=300, help="smali files in the synthetic tree")
+    parser.add_argument("--smali-lines", type=int, default=200, help="lines per synthetic smali file")
+    parser.add_argument("--timeout", type=float, default=300, help="per-request timeout in seconds")
+    parser.add_argument("--report", default="loadtest_report.json", help="where to write the JSON report")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.smali_files, args.smali_lines)
+        return
+
+    if args.apk:
+        with open(args.apk, "rb") as f:
+            apk_bytes = f.read()
+    else:
+        apk_bytes = os.urandom(args.apk_size_kb * 1024)
+
+    # The app writes uploads, reports and users.db relative to its cwd, so isolate it
+    workdir = tempfile.mkdtemp(prefix="mobipent_loadtest_")
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port),
+         "--smali-files", str(args.smali_files), "--smali-lines", str(args.smali_lines)],
+        cwd=workdir,
+        # Scans must run in the server process for its latency and RSS/CPU to mean anything
+        env={key: value for key, value in os.environ.items() if key != "MOBIPENT_SCAN_QUEUE"},
+        # The endpoints print a banner per scan; keep stderr for errors only
+        stdout=subprocess.DEVNULL,
+    )
+    monitor = ResourceMonitor(server.pid)
+    try:
+        wait_for_server(base_url)
+        requests.post(f"{base_url}/auth/signup", json={"email": LOADTEST_EMAIL, "password": LOADTEST_PASSWORD})
+
+        print(f"🚀 {args.clients} clients for {args.duration}s against {base_url}, mix {args.mix}")
+        results: List[Dict] = []
+        monitor.start()
+        started = time.monotonic()
+        deadline = started + args.duration
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            futures = [
+                pool.submit(run_client, client_id, LoadClient(base_url, apk_bytes, args.tool, args.timeout),
+                            args.mix, deadline, results)
+                for client_id in range(args.clients)
+            ]
+            # A client that died outside a request would otherwise just show up as lower throughput
+            for future in futures:
+                future.result()
+        elapsed = time.monotonic() - started
+        monitor.stop()
+
+        report = {
+            "config": {
+                "clients": args.clients,
+                "duration_seconds": args.duration,
+                "mix": args.mix,
+                "tool": args.tool,
+                "apk_bytes": len(apk_bytes),
+                "smali_files": args.smali_files,
+                "smali_lines": args.smali_lines,
+            },
+            **summarize(results, elapsed),
+            "server": monitor.summary(),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"✅ {report['total_requests']} requests, {report['scans_per_minute']} scans/min")
+    for operation, stats in report["operations"].items():
+        latency = stats["latency_ms"]
+        print(f"   {operation}: p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} ms, "
+              f"errors={stats['error_rate']:.1%}")
+    print(f"📄 Report written to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# backend/rules.py
+# pyright: reportMissingImports=false
+import re
+import time
+import signal
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Linear-time matching when google-re2 is installed; otherwise fall back to `re`
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+logger = logging.getLogger(__name__)
+
+# A rule that spends longer than this on one file is rejected for the rest of the scan
+FILE_TIME_LIMIT_SECONDS = 2.0
+# With the backtracking engine, longer lines are matched in overlapping windows of this length
+MAX_LINE_LENGTH = 1024
+
+# re flags re2 understands, as the inline groups it accepts instead of flag arguments
+_RE2_INLINE_FLAGS = {re.IGNORECASE: "i", re.DOTALL: "s", re.MULTILINE: "m"}
+
+class _RuleTimeout(Exception):
+    pass
+
+def _on_alarm(signum, frame):
+    raise _RuleTimeout()
+
+_alarm_installed = False
+
+@contextmanager
+def _time_limit(seconds: float):
+    """Interrupt a runaway match with SIGALRM; a no-op off the main thread or on Windows"""
+    global _alarm_installed
+    if not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    # Installed once: swapping handlers around every match cost more than most matches
+    if not _alarm_installed:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        _alarm_installed = True
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+class RuleGuard:
+    """
+    Runs analyzer regex rules under a time limit, records per-rule cost and
+    rejects rules that exceed the per-file time limit
+    """
+
+    def __init__(
+        self,
+        profile: bool = False,
+        file_time_limit: float = FILE_TIME_LIMIT_SECONDS,
+        max_line_length: int = MAX_LINE_LENGTH
+    ):
+        self.profile = profile
+        self.file_time_limit = file_time_limit
+        self.max_line_length = max_line_length
+        self.stats: Dict[str, Dict] = {}
+        self.rejected: Dict[str, str] = {}
+        self._compiled: Dict[tuple, tuple] = {}
+        self._last_content: Optional[str] = None
+        self._last_lines: List[str] = []
+        self._last_has_long_line = False
+
+    def _compile(self, pattern: str, flags: int):
+        """Return (compiled pattern, is_linear) for a pattern, preferring re2"""
+        key = (pattern, flags)
+        if key not in self._compiled:
+            compiled = None
+            if re2 is not None:
+                inline = "".join(letter for flag, letter in _RE2_INLINE_FLAGS.items() if flags & flag)
+                unsupported = flags & ~sum(_RE2_INLINE_FLAGS)
+                try:
+                    # re2.compile() takes re2.Options, not re flags, so pass them inline
+                    if not unsupported:
+                        compiled = (re2.compile(f"(?{inline}){pattern}" if inline else pattern), True)
+                except Exception:
+                    # Pattern uses a feature re2 lacks (e.g. backreferences)
+                    compiled = None
+            self._compiled[key] = compiled or (re.compile(pattern, flags), False)
+        return self._compiled[key]
+
+    def _windows(self, line: str):
+        """
+        Yield (window, owned) pairs covering a line. Windows overlap by half,
+        and each only reports matches starting in its first `owned` characters,
+        so a match up to half a window long is found exactly once
+        """
+        size = self.max_line_length
+        step = max(size // 2, 1)
+        offset = 0
+        while True:
+            window = line[offset:offset + size]
+            if offset + size >= len(line):
+                yield window, len(window)
+                return
+            yield window, step
+            offset += step
+
+    def _remember(self, content: str):
+        # Analyzers run several rules over the same file, so inspect it once
+        if content is not self._last_content:
+            self._last_content = content
+            self._last_lines = content.splitlines()
+            self._last_has_long_line = max(map(len, self._last_lines), default=0) > self.max_line_length
+
+    def _lines(self, content: str) -> List[str]:
+        self._remember(content)
+        return self._last_lines
+
+    def _needs_windows(self, content: str, flags: int) -> bool:
+        """Whether a backtracking match over the whole file could run away on one long line"""
+        self._remember(content)
+        # Without DOTALL `.` stops at line breaks, so normal files are matched in one pass
+        return self._last_has_long_line or bool(flags & re.DOTALL)
+
+    def _match_windowed(self, compiled, content: str, first_only: bool, stats: Dict, started: float) -> List[str]:
+        """Match line by line, splitting over-long lines into overlapping windows"""
+        matches = []
+        for line in self._lines(content):
+            if len(line) <= self.max_line_length:
+                windows = [(line, len(line))]
+            else:
+                windows = self._windows(line)
+                stats["windowed_lines"] += 1
+            for window, owned in windows:
+                for match in compiled.finditer(window):
+                    if match.start() >= owned:
+                        break
+                    matches.append(match.group(0))
+                    if first_only:
+                        return matches
+            # Fallback where the alarm is unavailable: stop between lines
+            if time.perf_counter() - started > self.file_time_limit:
+                raise _RuleTimeout()
+        return matches
+
+    def _run(self, rule: str, pattern: str, content: str, flags: int, first_only: bool) -> List[str]:
+        if rule in self.rejected:
+            return []
+
+        compiled, linear = self._compile(pattern, flags)
+        stats = self.stats.setdefault(rule, {
+            "pattern": pattern, "engine": "re2" if linear else "re",
+            "seconds": 0.0, "files": 0, "matches": 0, "windowed_lines": 0
+        })
+        # Split the file before starting the clock so its cost isn't billed to whichever rule runs first
+        windowed = not linear and self._needs_windows(content, flags)
+        matches = []
+        started = time.perf_counter()
+
+        try:
+            with _time_limit(self.file_time_limit):
+                if windowed:
+                    matches = self._match_windowed(compiled, content, first_only, stats, started)
+                elif first_only:
+                    match = compiled.search(content)
+                    matches = [match.group(0)] if match else []
+                else:
+                    matches = [match.group(0) for match in compiled.finditer(content)]
+        except _RuleTimeout:
+            self.rejected[rule] = f"exceeded {self.file_time_limit}s on a single file"
+            logger.warning(f"Rule {rule} rejected: {self.rejected[rule]}")
+
+        stats["seconds"] += time.perf_counter() - started
+        stats["files"] += 1
+        stats["matches"] += len(matches)
+        return matches
+
+    def search(self, rule: str, pattern: str, content: str, flags: int = 0) -> bool:
+        """Guarded equivalent of re.search"""
+        return bool(self._run(rule, pattern, content, flags, first_only=True))
+
+    def findall(self, rule: str, pattern: str, content: str, flags: int = 0) -> List[str]:
+        """Guarded equivalent of re.findall for patterns without groups"""
+        return self._run(rule, pattern, content, flags, first_only=False)
+
+    def report(self, top: int = 10) -> Dict:
+        """Engine in use, rejected rules and, in profiling mode, the most expensive rules"""
+        report = {
+            "engine": "re2" if re2 is not None else "re",
+            "rejected_rules": self.rejected
+        }
+        if re2 is not None:
+            # Rules re2 couldn't compile run on the backtracking engine anyway
+            report["backtracking_rules"] = sorted(
+                rule for rule, stats in self.stats.items() if stats["engine"] == "re"
+            )
+        if self.profile:
+            ranked = sorted(self.stats.items(), key=lambda item: item[1]["seconds"], reverse=True)
+            report["most_expensive_rules"] = [
+                {"rule": rule, **stats, "seconds": round(stats["seconds"], 4)}
+                for rule, stats in ranked[:top]
+            ]
+        return report
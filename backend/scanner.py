@@ -0,0 +1,1068 @@
+# backend/scanner.py
+# pyright: reportMissingImports=false
+"""
+Scan pipeline shared by the API (inline scans) and the queue workers
+"""
+import os
+import subprocess
+import xml.etree.ElementTree as ET
+import json
+import re
+import queue
+import shutil
+import signal
+import struct
+import threading
+import zipfile
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import logging
+import time
+
+from rules import RuleGuard
+
+logger = logging.getLogger(__name__)
+
+APKTOOL_BAT_PATH = r"C:\Users\Vishwanath BK\Tools\apktool\apktool.bat"
+SCAN_REPORTS_DIR = "scan_reports"
+
+# Per-scan budgets; a scan that runs out stops cleanly and reports partial results
+SCAN_TIME_BUDGET_SECONDS = 300
+SCAN_BYTE_BUDGET = None
+
+# Cheap, high-value checks first so they always complete within the budget
+DEFAULT_ANALYZER_ORDER = [
+    "analyze_manifest",
+    "analyze_network_security",
+    "analyze_crypto_security",
+    "analyze_storage_security",
+    "analyze_privacy",
+    "analyze_resilience",
+    "analyze_code_quality",
+]
+
+ANALYZER_CATEGORIES = {
+    "analyze_manifest": "MASVS-PLATFORM",
+    "analyze_storage_security": "MASVS-STORAGE",
+    "analyze_crypto_security": "MASVS-CRYPTO",
+    "analyze_network_security": "MASVS-NETWORK",
+    "analyze_code_quality": "MASVS-CODE",
+    "analyze_resilience": "MASVS-RESILIENCE",
+    "analyze_privacy": "MASVS-PRIVACY",
+}
+
+# Tool name -> (analyzers to run, category to return or None for all findings)
+TOOL_ANALYZERS = {
+    "Static Analysis": (["analyze_manifest", "analyze_storage_security", "analyze_code_quality"], None),
+    "Manifest Check": (["analyze_manifest"], "MASVS-PLATFORM"),
+    "Reverse Engineering": (["analyze_code_quality"], "MASVS-CODE"),
+    "Root Detection Test": (["analyze_resilience"], "MASVS-RESILIENCE"),
+    "Code Obfuscation Check": (["analyze_code_quality"], "MASVS-CODE"),
+    "Network Traffic Inspection": (["analyze_network_security"], "MASVS-NETWORK"),
+    "Crypto Analysis": (["analyze_crypto_security"], "MASVS-CRYPTO"),
+}
+
+# Analyzers that match file contents -> extensions they read
+FILE_ANALYZERS = {
+    "analyze_storage_security": ('.xml', '.properties', '.json', '.smali'),
+    "analyze_crypto_security": ('.smali',),
+    "analyze_network_security": ('.smali',),
+    "analyze_code_quality": ('.smali',),
+    "analyze_resilience": ('.smali',),
+    "analyze_privacy": ('.smali',),
+}
+
+# apktool reports each dex as it starts baksmaling it, e.g. "I: Baksmaling classes2.dex...";
+# resources (and the manifest) are decoded by then
+BAKSMALI_PROGRESS = re.compile(r'Baksmaling (classes\d*)\.dex')
+# Top-level dex files apktool decodes into smali/ and smali_classesN/
+DEX_ENTRY = re.compile(r'classes(\d*)\.dex')
+# apktool 2.9+ decodes dex files in parallel, so progress lines don't say when a dex is written.
+# A smali directory counts as written once it holds one file per class in the dex header and
+# hasn't changed for this long
+PIPELINE_SETTLE_SECONDS = 0.5
+
+# Hardcoded sensitive data
+SENSITIVE_DATA_PATTERNS = [
+    r'password\s*=\s*["\'][^"\']+["\']',
+    r'api_key\s*=\s*["\'][^"\']+["\']',
+    r'secret\s*=\s*["\'][^"\']+["\']',
+    r'token\s*=\s*["\'][^"\']+["\']',
+    r'private_key\s*=\s*["\'][^"\']+["\']'
+]
+
+# Weak crypto algorithms
+WEAK_CRYPTO = [
+    'MD5', 'SHA1', 'DES', 'RC4', 'ECB'
+]
+
+# Hardcoded keys/IVs
+CRYPTO_KEY_PATTERNS = [
+    r'AES.*KEY.*=.*["\'][^"\']{16,}["\']',
+    r'IV.*=.*["\'][^"\']{16,}["\']',
+    r'SALT.*=.*["\'][^"\']{8,}["\']'
+]
+
+URL_PATTERNS = [
+    r'http://[^\s"\']+',
+    r'https://[^\s"\']+',
+]
+
+LOG_PATTERNS = [
+    r'Log\.[vdiwea]\(',
+    r'System\.out\.print',
+    r'printStackTrace\(',
+]
+
+ANTI_DEBUG_PATTERNS = [
+    r'Debug.*detect',
+    r'isDebuggerConnected',
+    r'JDWP',
+    r'TracerPid'
+]
+
+ROOT_DETECTION_PATTERNS = [
+    r'su\b',
+    r'/system/bin/su',
+    r'/system/xbin/su',
+    r'busybox',
+    r'Superuser\.apk'
+]
+
+# Sensitive data collection
+PRIVACY_PATTERNS = [
+    r'IMEI',
+    r'IMSI',
+    r'getDeviceId',
+    r'getSubscriberId',
+    r'getSimSerialNumber',
+    r'getNetworkOperator',
+    r'getLastKnownLocation',
+    r'getContactList'
+]
+
+class ScanBudgetExceeded(Exception):
+    """Raised inside an analyzer when the scan's time or byte budget runs out"""
+
+class ScanCancelled(Exception):
+    """Raised when the scan's owner gives it up, e.g. a worker that lost its job lease"""
+
+class ScanError(Exception):
+    """A scan that cannot produce results, e.g. because extraction failed"""
+
+def _start_process_group(args: List[str], **kwargs) -> subprocess.Popen:
+    """Start a command in its own process group so it can be killed together with its children"""
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    return subprocess.Popen(args, **kwargs)
+
+def _kill_process_tree(process: subprocess.Popen):
+    """Kill a process started by _start_process_group and everything it spawned"""
+    # Killing apktool.bat alone leaves its java child decoding into the output directory
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    process.wait()
+
+def _expected_smali_counts(apk_path: str) -> Dict[str, int]:
+    """smali directory -> number of classes apktool will write there, from each dex header"""
+    counts = {}
+    try:
+        with zipfile.ZipFile(apk_path) as apk:
+            for entry in apk.namelist():
+                match = DEX_ENTRY.fullmatch(entry)
+                if not match:
+                    continue
+                with apk.open(entry) as dex:
+                    header = dex.read(0x70)
+                if len(header) < 0x70 or not header.startswith(b"dex\n"):
+                    continue
+                smali_dir = f"smali_classes{match.group(1)}" if match.group(1) else "smali"
+                # class_defs_size; baksmali writes one .smali file per class definition
+                counts[smali_dir] = struct.unpack_from("<I", header, 0x60)[0]
+    except (OSError, zipfile.BadZipFile):
+        return {}
+    return counts
+
+def _smali_signature(base_dir: str) -> Tuple[int, int, float]:
+    """(file count, total size, newest mtime) of the .smali files under base_dir"""
+    count, size, newest = 0, 0, 0.0
+    for root_dir, _, files in os.walk(base_dir):
+        for file in files:
+            if not file.endswith('.smali'):
+                continue
+            try:
+                stat = os.stat(os.path.join(root_dir, file))
+            except OSError:
+                continue
+            count += 1
+            size += stat.st_size
+            newest = max(newest, stat.st_mtime)
+    return count, size, newest
+
+def validate_budgets(time_budget: Optional[float], byte_budget: Optional[int]):
+    """Reject budgets that would stop a scan before it starts"""
+    if time_budget is not None and not time_budget > 0:
+        raise ValueError("time_budget must be a positive number of seconds")
+    if byte_budget is not None and byte_budget <= 0:
+        raise ValueError("byte_budget must be a positive number of bytes")
+
+def parse_analyzer_order(value: Optional[str]) -> List[str]:
+    """Parse a comma-separated analyzer order; unlisted analyzers run afterwards in default order"""
+    if not value:
+        return list(DEFAULT_ANALYZER_ORDER)
+    order = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in order if name not in ANALYZER_CATEGORIES]
+    if unknown:
+        raise ValueError(f"Unknown analyzers: {', '.join(unknown)}")
+    order = list(dict.fromkeys(order))
+    return order + [name for name in DEFAULT_ANALYZER_ORDER if name not in order]
+
+class OWASPMobileScanner:
+    """
+    OWASP MASVS/MASTG/MASWE compliant mobile security scanner
+    """
+    
+    def __init__(
+        self,
+        apk_path: str,
+        time_budget: Optional[float] = SCAN_TIME_BUDGET_SECONDS,
+        byte_budget: Optional[int] = SCAN_BYTE_BUDGET,
+        profile_rules: bool = False,
+        cancel_event: Optional[threading.Event] = None
+    ):
+        self.apk_path = apk_path
+        self.output_dir = apk_path + "_analysis"
+        self.manifest_path = os.path.join(self.output_dir, "AndroidManifest.xml")
+        self.findings = {
+            "MASVS-STORAGE": [],
+            "MASVS-CRYPTO": [],
+            "MASVS-AUTH": [],
+            "MASVS-NETWORK": [],
+            "MASVS-PLATFORM": [],
+            "MASVS-CODE": [],
+            "MASVS-RESILIENCE": [],
+            "MASVS-PRIVACY": []
+        }
+        self.risk_score = 0
+        self.total_tests = 0
+        self.passed_tests = 0
+        
+        # Budget tracking; the clock starts now so extraction counts against it
+        self.time_budget = time_budget
+        self.byte_budget = byte_budget
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + time_budget if time_budget is not None else None
+        self.bytes_scanned = 0
+        self.coverage: Dict[str, Dict[str, int]] = {}
+        self.unfinished_categories: List[str] = []
+        self.budget_reason: Optional[str] = None
+        self.cancel_event = cancel_event
+        # False when extraction stopped early and the APK gave no class counts to measure against
+        self.coverage_known = True
+        
+        # Regex rules run line-bounded through the guard, which also profiles them
+        self.rule_guard = RuleGuard(profile=profile_rules)
+        
+    def remaining_time(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+    
+    def check_budget(self):
+        """Raise ScanBudgetExceeded once the time or byte budget is spent, ScanCancelled if cancelled"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ScanCancelled("scan cancelled")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise ScanBudgetExceeded(f"time budget of {self.time_budget}s exhausted")
+        if self.byte_budget is not None and self.bytes_scanned >= self.byte_budget:
+            raise ScanBudgetExceeded(f"byte budget of {self.byte_budget} bytes exhausted")
+    
+    def list_files(self, extensions: Tuple[str, ...], base_dir: Optional[str] = None) -> List[Tuple[str, str]]:
+        """(file, file_path) for every file under base_dir (default: the whole output) with a matching extension"""
+        paths = []
+        for root_dir, _, files in os.walk(base_dir or self.output_dir):
+            for file in files:
+                if file.endswith(extensions):
+                    paths.append((file, os.path.join(root_dir, file)))
+        return paths
+    
+    def scan_files(self, paths: List[Tuple[str, str]], analyzers: List[str]):
+        """Read each file once and pass it to every analyzer that handles its extension"""
+        for file, file_path in paths:
+            wanted = [name for name in analyzers if file.endswith(FILE_ANALYZERS[name])]
+            if not wanted:
+                continue
+            self.check_budget()
+            try:
+                content = self.read_file(file_path)
+            except Exception:
+                continue
+            for name in wanted:
+                try:
+                    getattr(self, "match_" + name[len("analyze_"):])(file, content)
+                except Exception:
+                    pass
+                self._coverage(name)["files_scanned"] += 1
+    
+    def run_file_analyzer(self, name: str) -> Dict:
+        """Run one content analyzer over the fully extracted tree"""
+        suffix = name[len("analyze_"):]
+        getattr(self, "start_" + suffix)()
+        self.scan_files(self.list_files(FILE_ANALYZERS[name]), [name])
+        return getattr(self, "finish_" + suffix)()
+    
+    def read_file(self, file_path: str) -> str:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        self.bytes_scanned += len(content)
+        return content
+    
+    def _coverage(self, name: str) -> Dict[str, int]:
+        return self.coverage.setdefault(ANALYZER_CATEGORIES[name], {"files_scanned": 0, "files_total": 0})
+    
+    def plan_coverage(self, order: List[str], expected_smali: Optional[int] = None):
+        """
+        Count the files every content analyzer in order would read, whether or not it gets to run.
+        expected_smali covers smali apktool hadn't written yet when extraction was cut short
+        """
+        names = [name for name in order if name in FILE_ANALYZERS]
+        extensions = tuple({ext for name in names for ext in FILE_ANALYZERS[name]})
+        files = [file for file, _ in self.list_files(extensions)] if names else []
+        unwritten = 0
+        if expected_smali is not None:
+            unwritten = max(expected_smali - sum(1 for file in files if file.endswith('.smali')), 0)
+        for name in names:
+            total = sum(1 for file in files if file.endswith(FILE_ANALYZERS[name]))
+            if '.smali' in FILE_ANALYZERS[name]:
+                total += unwritten
+            self._coverage(name)["files_total"] = total
+    
+    def stop_for_budget(self, reason: str, unfinished: List[str]):
+        """Record why the scan stopped and which analyzers never finished"""
+        logger.warning(f"Scan stopped: {reason}")
+        self.budget_reason = reason
+        self.unfinished_categories = [ANALYZER_CATEGORIES[name] for name in unfinished]
+    
+    def run_analyses(self, order: Optional[List[str]] = None) -> bool:
+        """Run analyzers in order until done or out of budget; returns True if all finished"""
+        order = order or DEFAULT_ANALYZER_ORDER
+        self.plan_coverage(order)
+        for index, name in enumerate(order):
+            try:
+                getattr(self, name)()
+            except ScanBudgetExceeded as e:
+                logger.warning(f"Budget ran out in {name}")
+                self.stop_for_budget(str(e), order[index:])
+                return False
+        return True
+    
+    def run_scan(self, order: Optional[List[str]] = None) -> bool:
+        """Extract the APK, then run analyzers in order; returns True if all finished"""
+        order = order or DEFAULT_ANALYZER_ORDER
+        try:
+            extracted = self.extract_apk()
+        except ScanBudgetExceeded as e:
+            # Nothing was analyzed, but the caller still gets a report saying so
+            self.stop_for_budget(str(e), order)
+            return False
+        if not extracted:
+            raise ScanError("Failed to extract APK")
+        return self.run_analyses(order)
+    
+    def budget_status(self) -> Dict:
+        """Summarise how much of the scan completed within its budget"""
+        # Totals are planned up front, so analyzers that never started count as uncovered
+        files_scanned = sum(c["files_scanned"] for c in self.coverage.values())
+        files_total = sum(c["files_total"] for c in self.coverage.values())
+        if not self.coverage_known:
+            files_covered = None
+        elif files_total:
+            files_covered = round(files_scanned / files_total, 4)
+        else:
+            # No files to plan: either there were none or extraction never finished
+            files_covered = 0.0 if self.unfinished_categories else 1.0
+        return {
+            "completed": not self.unfinished_categories,
+            "reason": self.budget_reason,
+            "unfinished_categories": self.unfinished_categories,
+            "files_covered": files_covered,
+            "coverage": self.coverage,
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 2),
+            "bytes_scanned": self.bytes_scanned,
+            "time_budget_seconds": self.time_budget,
+            "byte_budget": self.byte_budget
+        }
+    
+    def extract_apk(self) -> bool:
+        """Extract APK using apktool; raises ScanBudgetExceeded if the time budget runs out first"""
+        try:
+            process = _start_process_group([
+                APKTOOL_BAT_PATH, "d", self.apk_path, 
+                "-o", self.output_dir, "-f"
+            ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except FileNotFoundError as e:
+            logger.error(f"APK extraction failed: {e}")
+            return False
+        
+        while True:
+            # Wake up periodically so a cancelled scan doesn't wait for apktool to finish
+            remaining = self.remaining_time()
+            try:
+                process.communicate(timeout=1.0 if remaining is None else min(remaining, 1.0))
+                break
+            except subprocess.TimeoutExpired:
+                try:
+                    self.check_budget()
+                except ScanBudgetExceeded as e:
+                    _kill_process_tree(process)
+                    raise ScanBudgetExceeded(f"{e} during extraction")
+                except ScanCancelled:
+                    _kill_process_tree(process)
+                    raise
+        if process.returncode != 0:
+            logger.error(f"APK extraction failed: apktool exited with {process.returncode}")
+            return False
+        return True
+
+    def run_pipelined(self, order: Optional[List[str]] = None) -> bool:
+        """
+        Extract and analyze at the same time: each dex's smali is scanned as soon
+        as apktool has written all of its classes, the manifest as soon as
+        resources are decoded.
+        Every file is read once for all content analyzers, so order only decides
+        which categories are finalised first. Returns True if all finished
+        """
+        order = order or DEFAULT_ANALYZER_ORDER
+        file_analyzers = [name for name in order if name in FILE_ANALYZERS]
+        extensions = tuple(sorted({ext for name in file_analyzers for ext in FILE_ANALYZERS[name]}))
+        manifest_done = "analyze_manifest" not in order
+        finished: List[str] = []
+        scanned = set()
+
+        def scan_dir(base_dir: str, wanted: Tuple[str, ...]):
+            paths = [p for p in self.list_files(wanted, base_dir) if p[1] not in scanned]
+            scanned.update(path for _, path in paths)
+            self.scan_files(paths, file_analyzers)
+
+        # Without class counts (not a zip, unreadable dex) the smali is scanned after extraction
+        expected = _expected_smali_counts(self.apk_path)
+        pending = dict(expected) if file_analyzers else {}
+        signatures: Dict[str, Tuple[int, int, float]] = {}
+
+        def scan_written_dirs():
+            for smali_dir, classes in list(pending.items()):
+                base_dir = os.path.join(self.output_dir, smali_dir)
+                signature = _smali_signature(base_dir)
+                # Every class is on disk and nothing grew since the last poll
+                if signature[0] >= classes and signatures.get(smali_dir) == signature:
+                    scan_dir(base_dir, ('.smali',))
+                    del pending[smali_dir]
+                signatures[smali_dir] = signature
+
+        # Output left by an earlier scan of this upload would look fully written
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+        try:
+            process = _start_process_group([
+                APKTOOL_BAT_PATH, "d", self.apk_path,
+                "-o", self.output_dir, "-f"
+            ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="ignore")
+        except FileNotFoundError as e:
+            logger.error(f"APK extraction failed: {e}")
+            raise ScanError("Failed to extract APK")
+
+        # apktool's progress output drives the pipeline; read it off-thread so the budget is still checked
+        lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        def read_output():
+            for line in process.stdout:
+                lines.put(line)
+            lines.put(None)
+        threading.Thread(target=read_output, daemon=True).start()
+
+        for name in file_analyzers:
+            getattr(self, "start_" + name[len("analyze_"):])()
+
+        try:
+            last_poll = time.monotonic()
+            while True:
+                self.check_budget()
+                try:
+                    line = lines.get(timeout=PIPELINE_SETTLE_SECONDS)
+                except queue.Empty:
+                    line = ""
+                if line is None:
+                    break
+
+                if not manifest_done and line.startswith("I:") and BAKSMALI_PROGRESS.search(line):
+                    if os.path.exists(self.manifest_path):
+                        self.analyze_manifest()
+                        manifest_done = True
+                        finished.append("analyze_manifest")
+
+                if pending and time.monotonic() - last_poll >= PIPELINE_SETTLE_SECONDS:
+                    scan_written_dirs()
+                    last_poll = time.monotonic()
+
+            if process.wait() != 0:
+                logger.error(f"APK extraction failed: apktool exited with {process.returncode}")
+                raise ScanError("Failed to extract APK")
+
+            # Everything not scanned yet: resources, assets, other dex, dirs still settling
+            if extensions:
+                scan_dir(self.output_dir, extensions)
+            for name in order:
+                if name in finished:
+                    continue
+                if name in FILE_ANALYZERS:
+                    getattr(self, "finish_" + name[len("analyze_"):])()
+                else:
+                    getattr(self, name)()
+                finished.append(name)
+        except ScanBudgetExceeded as e:
+            self.stop_for_budget(str(e), [name for name in order if name not in finished])
+            return False
+        finally:
+            exited_cleanly = process.poll() == 0
+            if process.poll() is None:
+                _kill_process_tree(process)
+            if exited_cleanly:
+                self.plan_coverage(order)
+            elif expected:
+                # Count the smali apktool never got to write as well
+                self.plan_coverage(order, sum(expected.values()))
+            else:
+                self.plan_coverage(order)
+                self.coverage_known = False
+        return True
+
+    def analyze_manifest(self) -> Dict:
+        """MASVS-PLATFORM: Analyze AndroidManifest.xml for security issues"""
+        findings = []
+        
+        if not os.path.exists(self.manifest_path):
+            findings.append({"severity": "HIGH", "issue": "AndroidManifest.xml not found"})
+            return {"findings": findings}
+        
+        try:
+            tree = ET.parse(self.manifest_path)
+            root = tree.getroot()
+            
+            # MASWE-0001: Debug mode detection
+            app_element = root.find('.//application')
+            if app_element is not None:
+                debuggable = app_element.get('{http://schemas.android.com/apk/res/android}debuggable')
+                if debuggable == "true":
+                    findings.append({
+                        "severity": "HIGH",
+                        "issue": "MASWE-0001: Debug mode enabled",
+                        "description": "Application is debuggable in production",
+                        "masvs_control": "MASVS-CODE-8"
+                    })
+                    self.risk_score += 25
+                
+                # MASWE-0002: Backup allowed
+                allow_backup = app_element.get('{http://schemas.android.com/apk/res/android}allowBackup')
+                if allow_backup != "false":
+                    findings.append({
+                        "severity": "MEDIUM",
+                        "issue": "MASWE-0002: Backup allowed",
+                        "description": "App data can be backed up via ADB",
+                        "masvs_control": "MASVS-STORAGE-1"
+                    })
+                    self.risk_score += 15
+                
+                # MASWE-0003: Clear text traffic
+                clear_text = app_element.get('{http://schemas.android.com/apk/res/android}usesCleartextTraffic')
+                if clear_text == "true":
+                    findings.append({
+                        "severity": "HIGH",
+                        "issue": "MASWE-0003: Clear text traffic allowed",
+                        "description": "App allows HTTP traffic",
+                        "masvs_control": "MASVS-NETWORK-1"
+                    })
+                    self.risk_score += 30
+            
+            # MASWE-0004: Exported components analysis
+            exported_components = []
+            for component in root.iter():
+                if component.tag in ['activity', 'service', 'receiver', 'provider']:
+                    exported = component.get('{http://schemas.android.com/apk/res/android}exported')
+                    if exported == "true":
+                        name = component.get('{http://schemas.android.com/apk/res/android}name')
+                        exported_components.append(f"{component.tag}: {name}")
+            
+            if exported_components:
+                findings.append({
+                    "severity": "MEDIUM",
+                    "issue": "MASWE-0004: Exported components found",
+                    "description": f"Components: {', '.join(exported_components)}",
+                    "masvs_control": "MASVS-PLATFORM-1"
+                })
+                self.risk_score += 10
+            
+            # MASWE-0005: Dangerous permissions
+            dangerous_perms = [
+                'READ_EXTERNAL_STORAGE', 'WRITE_EXTERNAL_STORAGE',
+                'READ_CONTACTS', 'WRITE_CONTACTS', 'ACCESS_FINE_LOCATION',
+                'ACCESS_COARSE_LOCATION', 'CAMERA', 'RECORD_AUDIO',
+                'READ_SMS', 'SEND_SMS', 'CALL_PHONE'
+            ]
+            
+            found_dangerous = []
+            for perm in root.findall('.//uses-permission'):
+                perm_name = perm.get('{http://schemas.android.com/apk/res/android}name')
+                if perm_name and any(dangerous in perm_name for dangerous in dangerous_perms):
+                    found_dangerous.append(perm_name.split('.')[-1])
+            
+            if found_dangerous:
+                findings.append({
+                    "severity": "MEDIUM",
+                    "issue": "MASWE-0005: Dangerous permissions",
+                    "description": f"Permissions: {', '.join(found_dangerous)}",
+                    "masvs_control": "MASVS-PLATFORM-1"
+                })
+                self.risk_score += 5
+            
+            self.findings["MASVS-PLATFORM"] = findings
+            return {"findings": findings}
+            
+        except Exception as e:
+            logger.error(f"Manifest analysis failed: {e}")
+            return {"findings": [{"severity": "ERROR", "issue": f"Analysis failed: {e}"}]}
+    
+    def analyze_storage_security(self) -> Dict:
+        """MASVS-STORAGE: Analyze data storage security"""
+        return self.run_file_analyzer("analyze_storage_security")
+    
+    def start_storage_security(self):
+        # Bound up front so partial results survive a budget stop
+        self.findings["MASVS-STORAGE"] = []
+    
+    def match_storage_security(self, file: str, content: str):
+        # Check for hardcoded sensitive data in resources and code
+        for pattern in SENSITIVE_DATA_PATTERNS:
+            if self.rule_guard.search(f"MASVS-STORAGE:{pattern}", pattern, content, re.IGNORECASE):
+                self.findings["MASVS-STORAGE"].append({
+                    "severity": "HIGH",
+                    "issue": "MASWE-0006: Hardcoded sensitive data",
+                    "description": f"Found in {file}",
+                    "masvs_control": "MASVS-STORAGE-1"
+                })
+                self.risk_score += 20
+                break
+    
+    def finish_storage_security(self) -> Dict:
+        findings = self.findings["MASVS-STORAGE"]
+        
+        # Check for database files
+        db_files = []
+        for root_dir, _, files in os.walk(self.output_dir):
+            for file in files:
+                if file.endswith(('.db', '.sqlite', '.sqlite3')):
+                    db_files.append(file)
+        
+        if db_files:
+            findings.append({
+                "severity": "MEDIUM",
+                "issue": "MASWE-0007: Database files found",
+                "description": f"Files: {', '.join(db_files)}",
+                "masvs_control": "MASVS-STORAGE-1"
+            })
+            self.risk_score += 10
+        
+        return {"findings": findings}
+    
+    def analyze_crypto_security(self) -> Dict:
+        """MASVS-CRYPTO: Analyze cryptographic implementations"""
+        return self.run_file_analyzer("analyze_crypto_security")
+    
+    def start_crypto_security(self):
+        self.findings["MASVS-CRYPTO"] = []
+    
+    def match_crypto_security(self, file: str, content: str):
+        findings = self.findings["MASVS-CRYPTO"]
+        
+        # Check for weak algorithms
+        for weak in WEAK_CRYPTO:
+            if weak in content:
+                findings.append({
+                    "severity": "HIGH",
+                    "issue": f"MASWE-0008: Weak crypto algorithm {weak}",
+                    "description": f"Found in {file}",
+                    "masvs_control": "MASVS-CRYPTO-1"
+                })
+                self.risk_score += 25
+                break
+        
+        # Check for hardcoded crypto keys
+        for pattern in CRYPTO_KEY_PATTERNS:
+            if self.rule_guard.search(f"MASVS-CRYPTO:{pattern}", pattern, content, re.IGNORECASE):
+                findings.append({
+                    "severity": "HIGH",
+                    "issue": "MASWE-0009: Hardcoded crypto key",
+                    "description": f"Found in {file}",
+                    "masvs_control": "MASVS-CRYPTO-2"
+                })
+                self.risk_score += 30
+                break
+    
+    def finish_crypto_security(self) -> Dict:
+        return {"findings": self.findings["MASVS-CRYPTO"]}
+    
+    def analyze_network_security(self) -> Dict:
+        """MASVS-NETWORK: Analyze network security"""
+        return self.run_file_analyzer("analyze_network_security")
+    
+    def start_network_security(self):
+        self.findings["MASVS-NETWORK"] = []
+        self.http_urls = []
+    
+    def match_network_security(self, file: str, content: str):
+        # Check for URL patterns in code
+        for pattern in URL_PATTERNS:
+            matches = self.rule_guard.findall(f"MASVS-NETWORK:{pattern}", pattern, content)
+            for match in matches:
+                if match.startswith('http://'):
+                    self.http_urls.append(match)
+    
+    def finish_network_security(self) -> Dict:
+        findings = self.findings["MASVS-NETWORK"]
+        
+        # Check network security config
+        nsc_path = os.path.join(self.output_dir, "res", "xml", "network_security_config.xml")
+        if os.path.exists(nsc_path):
+            try:
+                tree = ET.parse(nsc_path)
+                root = tree.getroot()
+                
+                # Check for trust-user-certs
+                if root.find('.//trust-user-certs') is not None:
+                    findings.append({
+                        "severity": "MEDIUM",
+                        "issue": "MASWE-0010: User certificates trusted",
+                        "description": "App trusts user-added certificates",
+                        "masvs_control": "MASVS-NETWORK-3"
+                    })
+                    self.risk_score += 15
+                
+                # Check for cleartext permitted
+                if root.find('.//base-config[@cleartextTrafficPermitted="true"]') is not None:
+                    findings.append({
+                        "severity": "HIGH",
+                        "issue": "MASWE-0011: Clear text traffic permitted",
+                        "description": "Network security config allows HTTP",
+                        "masvs_control": "MASVS-NETWORK-1"
+                    })
+                    self.risk_score += 25
+                    
+            except Exception:
+                pass
+        
+        if self.http_urls:
+            findings.append({
+                "severity": "MEDIUM",
+                "issue": "MASWE-0012: HTTP URLs found",
+                "description": f"Insecure URLs: {len(self.http_urls)} found",
+                "masvs_control": "MASVS-NETWORK-1"
+            })
+            self.risk_score += 10
+        
+        return {"findings": findings}
+    
+    def analyze_code_quality(self) -> Dict:
+        """MASVS-CODE: Analyze code quality and obfuscation"""
+        return self.run_file_analyzer("analyze_code_quality")
+    
+    def start_code_quality(self):
+        self.findings["MASVS-CODE"] = []
+        self.log_statements = 0
+    
+    def match_code_quality(self, file: str, content: str):
+        # Check for logging statements
+        for pattern in LOG_PATTERNS:
+            self.log_statements += len(self.rule_guard.findall(f"MASVS-CODE:{pattern}", pattern, content))
+    
+    def finish_code_quality(self) -> Dict:
+        findings = self.findings["MASVS-CODE"]
+        
+        # Analyze code obfuscation
+        smali_dir = os.path.join(self.output_dir, "smali")
+        if os.path.exists(smali_dir):
+            short_names = 0
+            long_names = 0
+            total_classes = 0
+            
+            for root_dir, _, files in os.walk(smali_dir):
+                for file in files:
+                    if file.endswith(".smali"):
+                        total_classes += 1
+                        name = file.replace(".smali", "")
+                        if len(name) <= 2 or re.match(r'^[a-z]{1,3}$', name):
+                            short_names += 1
+                        else:
+                            long_names += 1
+            
+            if total_classes > 0:
+                obfuscation_ratio = short_names / total_classes
+                if obfuscation_ratio < 0.3:
+                    findings.append({
+                        "severity": "MEDIUM",
+                        "issue": "MASWE-0013: Code not obfuscated",
+                        "description": f"Only {obfuscation_ratio:.1%} of classes appear obfuscated",
+                        "masvs_control": "MASVS-CODE-6"
+                    })
+                    self.risk_score += 15
+                else:
+                    findings.append({
+                        "severity": "INFO",
+                        "issue": "Code appears obfuscated",
+                        "description": f"{obfuscation_ratio:.1%} of classes appear obfuscated",
+                        "masvs_control": "MASVS-CODE-6"
+                    })
+        
+        if self.log_statements > 10:
+            findings.append({
+                "severity": "MEDIUM",
+                "issue": "MASWE-0014: Excessive logging",
+                "description": f"Found {self.log_statements} logging statements",
+                "masvs_control": "MASVS-CODE-8"
+            })
+            self.risk_score += 10
+        
+        return {"findings": findings}
+    
+    def analyze_resilience(self) -> Dict:
+        """MASVS-RESILIENCE: Analyze anti-tampering and runtime protection"""
+        return self.run_file_analyzer("analyze_resilience")
+    
+    def start_resilience(self):
+        self.findings["MASVS-RESILIENCE"] = []
+        self.protection_found = False
+    
+    def match_resilience(self, file: str, content: str):
+        findings = self.findings["MASVS-RESILIENCE"]
+        
+        # Check for anti-debug
+        for pattern in ANTI_DEBUG_PATTERNS:
+            if self.rule_guard.search(f"MASVS-RESILIENCE:{pattern}", pattern, content, re.IGNORECASE):
+                findings.append({
+                    "severity": "INFO",
+                    "issue": "Anti-debugging measures found",
+                    "description": f"Found in {file}",
+                    "masvs_control": "MASVS-RESILIENCE-2"
+                })
+                self.protection_found = True
+                break
+        
+        # Check for root detection
+        for pattern in ROOT_DETECTION_PATTERNS:
+            if self.rule_guard.search(f"MASVS-RESILIENCE:{pattern}", pattern, content, re.IGNORECASE):
+                findings.append({
+                    "severity": "INFO",
+                    "issue": "Root detection found",
+                    "description": f"Found in {file}",
+                    "masvs_control": "MASVS-RESILIENCE-1"
+                })
+                self.protection_found = True
+                break
+    
+    def finish_resilience(self) -> Dict:
+        findings = self.findings["MASVS-RESILIENCE"]
+        if not self.protection_found:
+            findings.append({
+                "severity": "MEDIUM",
+                "issue": "MASWE-0015: No runtime protection",
+                "description": "No anti-tampering measures detected",
+                "masvs_control": "MASVS-RESILIENCE-1"
+            })
+            self.risk_score += 15
+        
+        return {"findings": findings}
+    
+    def analyze_privacy(self) -> Dict:
+        """MASVS-PRIVACY: Analyze privacy and data protection"""
+        return self.run_file_analyzer("analyze_privacy")
+    
+    def start_privacy(self):
+        self.findings["MASVS-PRIVACY"] = []
+        self.privacy_issues = []
+    
+    def match_privacy(self, file: str, content: str):
+        # Check for sensitive data collection
+        for pattern in PRIVACY_PATTERNS:
+            if self.rule_guard.search(f"MASVS-PRIVACY:{pattern}", pattern, content, re.IGNORECASE):
+                self.privacy_issues.append(pattern)
+    
+    def finish_privacy(self) -> Dict:
+        findings = self.findings["MASVS-PRIVACY"]
+        if self.privacy_issues:
+            findings.append({
+                "severity": "MEDIUM",
+                "issue": "MASWE-0016: Sensitive data access",
+                "description": f"Accesses: {', '.join(set(self.privacy_issues))}",
+                "masvs_control": "MASVS-PRIVACY-1"
+            })
+            self.risk_score += 10
+        
+        return {"findings": findings}
+    
+    def generate_report(self) -> Dict:
+        """Generate comprehensive OWASP compliance report"""
+        # Calculate statistics
+        total_findings = sum(len(findings) for findings in self.findings.values())
+        high_severity = sum(1 for findings in self.findings.values() 
+                          for finding in findings if finding.get("severity") == "HIGH")
+        medium_severity = sum(1 for findings in self.findings.values() 
+                            for finding in findings if finding.get("severity") == "MEDIUM")
+        
+        # Risk assessment
+        if self.risk_score >= 100:
+            risk_level = "CRITICAL"
+        elif self.risk_score >= 70:
+            risk_level = "HIGH"
+        elif self.risk_score >= 40:
+            risk_level = "MEDIUM"
+        else:
+            risk_level = "LOW"
+        
+        # Generate summary
+        summary = []
+        for category, findings in self.findings.items():
+            if category in self.unfinished_categories:
+                summary.append(f"⏱️ {category}: Scan incomplete, {len(findings)} issues found before budget ran out")
+            elif findings:
+                summary.append(f"🔍 {category}: {len(findings)} issues found")
+            else:
+                summary.append(f"✅ {category}: No issues found")
+        
+        report = {
+            "scan_info": {
+                "timestamp": datetime.now().isoformat(),
+                "apk_file": os.path.basename(self.apk_path),
+                "scanner_version": "1.0.0",
+                "owasp_version": "MASVS 2.1.0"
+            },
+            "risk_assessment": {
+                "risk_level": risk_level,
+                "risk_score": self.risk_score,
+                "total_findings": total_findings,
+                "high_severity": high_severity,
+                "medium_severity": medium_severity
+            },
+            "summary": summary,
+            "scan_budget": self.budget_status(),
+            "rule_guard": self.rule_guard.report(),
+            "detailed_findings": self.findings,
+            "recommendations": self.generate_recommendations()
+        }
+        
+        return report
+    
+    def generate_recommendations(self) -> List[str]:
+        """Generate security recommendations based on findings"""
+        recommendations = []
+        
+        if any("Debug mode" in str(finding) for findings in self.findings.values() for finding in findings):
+            recommendations.append("🔧 Disable debug mode in production builds")
+        
+        if any("Backup" in str(finding) for findings in self.findings.values() for finding in findings):
+            recommendations.append("🔧 Set android:allowBackup=\"false\" in AndroidManifest.xml")
+        
+        if any("Clear text" in str(finding) for findings in self.findings.values() for finding in findings):
+            recommendations.append("🔧 Implement proper TLS/SSL and disable clear text traffic")
+        
+        if any("Hardcoded" in str(finding) for findings in self.findings.values() for finding in findings):
+            recommendations.append("🔧 Remove hardcoded secrets and use secure key management")
+        
+        if any("obfuscated" in str(finding) for findings in self.findings.values() for finding in findings):
+            recommendations.append("🔧 Implement code obfuscation and minification")
+        
+        if any("runtime protection" in str(finding) for findings in self.findings.values() for finding in findings):
+            recommendations.append("🔧 Implement anti-tampering and runtime protection")
+        
+        return recommendations
+
+
+def run_comprehensive_scan(
+    file_location: str,
+    filename: str,
+    time_budget: Optional[float] = SCAN_TIME_BUDGET_SECONDS,
+    byte_budget: Optional[int] = SCAN_BYTE_BUDGET,
+    analyzer_order: Optional[List[str]] = None,
+    profile_rules: bool = False,
+    pipeline: bool = False,
+    cancel_event: Optional[threading.Event] = None
+) -> Dict:
+    """Extract the APK, run every analyzer within the budget and save the report"""
+    scanner = OWASPMobileScanner(
+        file_location, time_budget=time_budget, byte_budget=byte_budget, profile_rules=profile_rules,
+        cancel_event=cancel_event
+    )
+    
+    if pipeline:
+        print("🔍 Running OWASP MASVS compliance tests alongside extraction...")
+        completed = scanner.run_pipelined(analyzer_order)
+    else:
+        print("🔍 Running OWASP MASVS compliance tests...")
+        
+        # Extract and execute security analyses until done or out of budget
+        completed = scanner.run_scan(analyzer_order)
+    
+    if not completed:
+        print(f"⏱️ Scan budget exhausted, unfinished: {', '.join(scanner.unfinished_categories)}")
+    
+    # Generate comprehensive report
+    report = scanner.generate_report()
+    
+    # Save report
+    os.makedirs(SCAN_REPORTS_DIR, exist_ok=True)
+    report_file = os.path.join(SCAN_REPORTS_DIR, f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"✅ Analysis complete. Risk Level: {report['risk_assessment']['risk_level']}")
+    
+    return {
+        "analysis_type": "OWASP MASVS/MASTG Comprehensive",
+        "file": filename,
+        "report": report
+    }
+
+def run_tool_scan(
+    tool_name: str,
+    file_location: str,
+    filename: str,
+    time_budget: Optional[float] = SCAN_TIME_BUDGET_SECONDS,
+    byte_budget: Optional[int] = SCAN_BYTE_BUDGET,
+    profile_rules: bool = False,
+    pipeline: bool = False,
+    cancel_event: Optional[threading.Event] = None
+) -> Dict:
+    """Run the analyzers behind one tool and return its findings"""
+    if tool_name not in TOOL_ANALYZERS:
+        return {"tool_used": tool_name, "file": filename, "result": {"summary": [f"❌ Unknown tool: {tool_name}"]}}
+    
+    scanner = OWASPMobileScanner(
+        file_location, time_budget=time_budget, byte_budget=byte_budget, profile_rules=profile_rules,
+        cancel_event=cancel_event
+    )
+    
+    # Map tools to OWASP analyses
+    analyzers, category = TOOL_ANALYZERS[tool_name]
+    try:
+        completed = scanner.run_pipelined(analyzers) if pipeline else scanner.run_scan(analyzers)
+    except ScanError:
+        return {"tool_used": tool_name, "file": filename, "result": {"summary": ["❌ APK extraction failed"]}}
+    result = {"summary": scanner.findings if category is None else scanner.findings[category]}
+    if not completed:
+        result["scan_budget"] = scanner.budget_status()
+    if profile_rules or scanner.rule_guard.rejected:
+        result["rule_guard"] = scanner.rule_guard.report()
+    
+    return {"tool_used": tool_name, "file": filename, "result": result}
@@ -0,0 +1,288 @@
+# pyright: reportMissingImports=false
+# backend/uploads.py
+from fastapi import APIRouter, HTTPException, Request, Header
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import Dict, Optional, Tuple
+import os
+import json
+import time
+import uuid
+import base64
+import hashlib
+import binascii
+import shutil
+import threading
+
+router = APIRouter()
+
+UPLOAD_DIR = "uploads"
+UPLOAD_SESSIONS_DIR = os.path.join(UPLOAD_DIR, "sessions")
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_UPLOAD_SIZE = 500 * 1024 * 1024
+SUPPORTED_CHECKSUMS = ("sha256", "md5")
+# Sessions untouched for this long are deleted along with their partial data, or the
+# finalized APK and its extracted tree
+UPLOAD_SESSION_TTL_SECONDS = 24 * 60 * 60
+UPLOAD_SWEEP_INTERVAL_SECONDS = 10 * 60
+
+os.makedirs(UPLOAD_SESSIONS_DIR, exist_ok=True)
+
+# One lock per session so concurrent PUTs for the same upload can't interleave
+_session_locks: Dict[str, threading.Lock] = {}
+_session_locks_guard = threading.Lock()
+_last_sweep = 0.0
+
+class UploadSession(BaseModel):
+    filename: str
+    total_size: int
+    checksum: str
+    checksum_algorithm: str = "sha256"
+
+# === Session storage ===
+def _validate_id(upload_id: str):
+    # upload_id is used as a file name and lock key, so only accept what we hand out
+    try:
+        if uuid.UUID(hex=upload_id).hex != upload_id:
+            raise ValueError(upload_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+def _session_lock(upload_id: str) -> threading.Lock:
+    _validate_id(upload_id)
+    with _session_locks_guard:
+        return _session_locks.setdefault(upload_id, threading.Lock())
+
+def _drop_session_lock(upload_id: str):
+    with _session_locks_guard:
+        _session_locks.pop(upload_id, None)
+
+def _meta_path(upload_id: str) -> str:
+    return os.path.join(UPLOAD_SESSIONS_DIR, f"{upload_id}.json")
+
+def _part_path(upload_id: str) -> str:
+    return os.path.join(UPLOAD_SESSIONS_DIR, f"{upload_id}.part")
+
+def _load_session(upload_id: str) -> Dict:
+    _validate_id(upload_id)
+    try:
+        with open(_meta_path(upload_id), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+def _save_session(session: Dict):
+    session["updated_at"] = time.time()
+    tmp_path = _meta_path(session["upload_id"]) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(session, f)
+    os.replace(tmp_path, _meta_path(session["upload_id"]))
+
+def _file_checksum(path: str, algorithm: str) -> str:
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _remove_session_files(upload_id: str, file_location: Optional[str] = None):
+    for path in (_part_path(upload_id), file_location, _meta_path(upload_id)):
+        if path and os.path.exists(path):
+            os.remove(path)
+    if file_location:
+        # Scans extract next to the APK
+        shutil.rmtree(file_location + "_analysis", ignore_errors=True)
+
+def sweep_expired_sessions(now: Optional[float] = None) -> int:
+    """Delete sessions, finalized or not, idle for longer than the TTL; returns how many were removed"""
+    now = now or time.time()
+    removed = 0
+    for name in os.listdir(UPLOAD_SESSIONS_DIR):
+        upload_id, ext = os.path.splitext(name)
+        if ext != ".json":
+            continue
+        try:
+            with _session_lock(upload_id):
+                session = _load_session(upload_id)
+                if now - session.get("updated_at", 0) < UPLOAD_SESSION_TTL_SECONDS:
+                    continue
+                _remove_session_files(upload_id, session.get("file_location"))
+        except (HTTPException, OSError, ValueError):
+            continue
+        _drop_session_lock(upload_id)
+        removed += 1
+    return removed
+
+def _maybe_sweep():
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < UPLOAD_SWEEP_INTERVAL_SECONDS:
+        return
+    _last_sweep = now
+    removed = sweep_expired_sessions(now)
+    if removed:
+        print(f"🧹 Removed {removed} expired upload sessions")
+
+def _append_chunk(upload_id: str, offset: int, data: bytes) -> Dict:
+    """Write a chunk under the session lock; blocking, so run it off the event loop"""
+    with _session_lock(upload_id):
+        session = _load_session(upload_id)
+        if session["finalized"]:
+            raise HTTPException(status_code=409, detail="Upload already finalized")
+        if offset != session["offset"]:
+            # Client and server disagree (e.g. a retried chunk); tell it where to resume
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Offset mismatch", "offset": session["offset"]},
+            )
+        if offset + len(data) > session["total_size"]:
+            raise HTTPException(status_code=400, detail="Chunk exceeds declared total_size")
+
+        with open(_part_path(upload_id), "r+b") as f:
+            # Drop any bytes from a write that never got committed
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        session["offset"] = offset + len(data)
+        _save_session(session)
+    return session
+
+async def _read_chunk_body(request: Request, limit: int) -> bytes:
+    """Read the request body, refusing anything over limit before buffering it"""
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            if int(content_length) > limit:
+                raise HTTPException(status_code=413, detail=f"Chunk exceeds {MAX_CHUNK_SIZE} bytes")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length")
+
+    # Chunked transfer encoding has no length up front; stop as soon as it overflows
+    body = bytearray()
+    async for piece in request.stream():
+        body.extend(piece)
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"Chunk exceeds {MAX_CHUNK_SIZE} bytes")
+    return bytes(body)
+
+def resolve_upload(upload_id: str) -> Tuple[str, str]:
+    """Return (file_location, filename) of a finalized upload for the scan endpoints"""
+    session = _load_session(upload_id)
+    if not session.get("finalized"):
+        raise HTTPException(status_code=409, detail="Upload has not been finalized")
+    if not os.path.exists(session["file_location"]):
+        raise HTTPException(status_code=410, detail="Uploaded file is no longer available")
+    return session["file_location"], session["filename"]
+
+# === Endpoints ===
+@router.post("/sessions")
+def create_session(upload: UploadSession):
+    """Start a resumable upload; chunks are then PUT at increasing offsets"""
+    algorithm = upload.checksum_algorithm.lower()
+    if algorithm not in SUPPORTED_CHECKSUMS:
+        raise HTTPException(status_code=400, detail=f"Unsupported checksum algorithm: {algorithm}")
+    filename = os.path.basename(upload.filename)
+    if not filename.endswith(".apk"):
+        raise HTTPException(status_code=400, detail="Invalid file type")
+    if upload.total_size <= 0:
+        raise HTTPException(status_code=400, detail="total_size must be positive")
+    if upload.total_size > MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=f"Uploads are limited to {MAX_UPLOAD_SIZE} bytes")
+    _maybe_sweep()
+
+    session = {
+        "upload_id": uuid.uuid4().hex,
+        "filename": filename,
+        "total_size": upload.total_size,
+        "checksum": upload.checksum.lower(),
+        "checksum_algorithm": algorithm,
+        "offset": 0,
+        "finalized": False,
+    }
+    open(_part_path(session["upload_id"]), "wb").close()
+    _save_session(session)
+    return {
+        "upload_id": session["upload_id"],
+        "offset": 0,
+        "max_chunk_size": MAX_CHUNK_SIZE,
+    }
+
+@router.get("/sessions/{upload_id}")
+def get_session(upload_id: str):
+    """Report the committed offset so a client can resume after a dropped connection"""
+    session = _load_session(upload_id)
+    return {
+        "upload_id": upload_id,
+        "filename": session["filename"],
+        "offset": session["offset"],
+        "total_size": session["total_size"],
+        "finalized": session["finalized"],
+    }
+
+@router.put("/sessions/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    x_chunk_encoding: Optional[str] = Header(None),
+):
+    """Append one chunk at `offset`; the body is raw bytes, or base64 with X-Chunk-Encoding: base64"""
+    _validate_id(upload_id)
+    # base64 bodies are 4/3 the size of the chunk they carry
+    limit = MAX_CHUNK_SIZE if x_chunk_encoding != "base64" else (MAX_CHUNK_SIZE + 2) // 3 * 4
+    data = await _read_chunk_body(request, limit)
+    if x_chunk_encoding == "base64":
+        try:
+            data = base64.b64decode(data, validate=True)
+        except (binascii.Error, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid base64 chunk")
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty chunk")
+    if len(data) > MAX_CHUNK_SIZE:
+        raise HTTPException(status_code=413, detail=f"Chunk exceeds {MAX_CHUNK_SIZE} bytes")
+
+    # The session lock may be held by a finalize that is hashing the whole file
+    session = await run_in_threadpool(_append_chunk, upload_id, offset, data)
+    return {"upload_id": upload_id, "offset": session["offset"], "total_size": session["total_size"]}
+
+@router.post("/sessions/{upload_id}/finalize")
+def finalize_session(upload_id: str):
+    """Verify size and checksum, then hand the APK over to the scan endpoints"""
+    with _session_lock(upload_id):
+        session = _load_session(upload_id)
+        if session["finalized"]:
+            return {"upload_id": upload_id, "file": session["filename"], "finalized": True}
+        if session["offset"] != session["total_size"]:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Upload incomplete", "offset": session["offset"]},
+            )
+
+        part_path = _part_path(upload_id)
+        checksum = _file_checksum(part_path, session["checksum_algorithm"])
+        if checksum != session["checksum"]:
+            # The data is unusable; make the client start over
+            _remove_session_files(upload_id)
+            _drop_session_lock(upload_id)
+            raise HTTPException(status_code=422, detail="Checksum mismatch, upload discarded")
+
+        file_location = os.path.join(UPLOAD_DIR, f"{upload_id}_{session['filename']}")
+        os.replace(part_path, file_location)
+        session["finalized"] = True
+        session["file_location"] = file_location
+        _save_session(session)
+    # Finalized sessions take no more writes, so the lock is no longer needed
+    _drop_session_lock(upload_id)
+
+    return {"upload_id": upload_id, "file": session["filename"], "finalized": True}
+
+@router.delete("/sessions/{upload_id}")
+def abort_session(upload_id: str):
+    with _session_lock(upload_id):
+        session = _load_session(upload_id)
+        _remove_session_files(upload_id, session.get("file_location"))
+    _drop_session_lock(upload_id)
+    return {"message": "Upload session deleted"}
@@ -0,0 +1,138 @@
+# backend/worker.py
+"""
+Standalone scan worker: claims jobs from the shared queue and runs the scan
+pipeline. Run one or more per node, from a directory whose uploads/ is the
+volume the API nodes write to:
+
+    python worker.py --queue sqlite:///jobs.db
+"""
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from jobs import JOB_LEASE_SECONDS, JobQueue, open_queue
+from scanner import ScanCancelled, ScanError, run_comprehensive_scan, run_tool_scan
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run_scan_job(payload: Dict, cancel_event: Optional[threading.Event] = None) -> Dict:
+    """Run the scan described by a job payload and return the API response body"""
+    if payload["kind"] == "comprehensive":
+        return run_comprehensive_scan(
+            payload["file_location"],
+            payload["filename"],
+            time_budget=payload.get("time_budget"),
+            byte_budget=payload.get("byte_budget"),
+            analyzer_order=payload.get("analyzer_order"),
+            profile_rules=payload.get("profile_rules", False),
+            pipeline=payload.get("pipeline", False),
+            cancel_event=cancel_event
+        )
+    if payload["kind"] == "tool":
+        return run_tool_scan(
+            payload["tool_name"],
+            payload["file_location"],
+            payload["filename"],
+            time_budget=payload.get("time_budget"),
+            byte_budget=payload.get("byte_budget"),
+            profile_rules=payload.get("profile_rules", False),
+            pipeline=payload.get("pipeline", False),
+            cancel_event=cancel_event
+        )
+    raise ScanError(f"Unknown job kind: {payload['kind']}")
+
+class Heartbeat(threading.Thread):
+    """Keeps a job's lease alive while the scan runs in the main thread; sets `lost` if it's reclaimed"""
+
+    def __init__(self, queue: JobQueue, job_id: str, worker_id: str, lease_seconds: float):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(self.job_id, self.worker_id, self.lease_seconds):
+                    logger.warning(f"Lost lease on job {self.job_id}")
+                    self.lost.set()
+                    return
+            except Exception as e:
+                # Transient queue errors: keep trying until the lease actually lapses
+                logger.error(f"Heartbeat for job {self.job_id} failed: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def process_job(queue: JobQueue, job: Dict, worker_id: str, lease_seconds: float):
+    job_id = job["id"]
+    logger.info(f"Claimed job {job_id} (attempt {job['attempts']})")
+    heartbeat = Heartbeat(queue, job_id, worker_id, lease_seconds)
+    heartbeat.start()
+    try:
+        # Another worker may already be extracting into the same directory, so stop as soon as the lease is gone
+        result = run_scan_job(job["payload"], cancel_event=heartbeat.lost)
+    except ScanCancelled:
+        heartbeat.stop()
+        logger.warning(f"Abandoned job {job_id} after losing its lease")
+        return
+    except ScanError as e:
+        # Deterministic failures (bad APK) won't succeed on another worker
+        heartbeat.stop()
+        queue.fail(job_id, worker_id, str(e), retry=False)
+        logger.error(f"Job {job_id} failed: {e}")
+        return
+    except KeyboardInterrupt:
+        heartbeat.stop()
+        queue.fail(job_id, worker_id, "Worker stopped")
+        raise
+    except Exception as e:
+        heartbeat.stop()
+        queue.fail(job_id, worker_id, f"Analysis failed: {e}")
+        logger.error(f"Job {job_id} failed: {e}")
+        return
+
+    heartbeat.stop()
+    if queue.complete(job_id, worker_id, result):
+        logger.info(f"Completed job {job_id}")
+    else:
+        logger.warning(f"Job {job_id} was reclaimed before it completed; result discarded")
+
+def run_worker(queue: JobQueue, worker_id: str, lease_seconds: float, poll_interval: float, once: bool = False):
+    logger.info(f"Worker {worker_id} polling for jobs")
+    while True:
+        job = queue.claim(worker_id, lease_seconds)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        process_job(queue, job, worker_id, lease_seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description="MobiPent scan worker")
+    parser.add_argument("--queue", default=os.environ.get("MOBIPENT_SCAN_QUEUE", "sqlite:///jobs.db"),
+                        help="job queue URL, e.g. sqlite:///jobs.db")
+    parser.add_argument("--lease", type=float, default=JOB_LEASE_SECONDS, help="lease length in seconds")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between polls when idle")
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    args = parser.parse_args()
+
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    try:
+        run_worker(open_queue(args.queue), worker_id, args.lease, args.poll_interval, once=args.once)
+    except KeyboardInterrupt:
+        logger.info(f"Worker {worker_id} stopped")
+
+if __name__ == "__main__":
+    main()
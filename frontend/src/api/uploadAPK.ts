@@ -1,37 +1,183 @@
+import axios from 'axios';
 import { getToken } from '../utils/storage';
 import * as FileSystem from 'expo-file-system';
 import { API_URL } from '../config'; // ✅ import your backend base URL
 
+// 1 MB chunks: small enough to resend cheaply on a flaky connection
+const CHUNK_SIZE = 1024 * 1024;
+const MAX_RETRIES = 5;
+const JOB_POLL_INTERVAL_MS = 2000;
+// Covers time spent queued behind other scans plus the server's scan budget
+const JOB_MAX_WAIT_MS = 30 * 60 * 1000;
+
+// Unfinished sessions keyed by file checksum, so picking the same APK again resumes it
+const pendingUploads: Record<string, string> = {};
+
+export type UploadProgress = {
+  bytesSent: number;
+  totalBytes: number;
+};
+
+function sleep(ms: number) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+async function getCommittedOffset(uploadId: string, headers: Record<string, string>) {
+  const res = await axios.get(`${API_URL}/upload/sessions/${uploadId}`, { headers });
+  return res.data.offset as number;
+}
+
+// Backends running scan workers answer 202 with a job id; wait for the worker's result
+async function waitForJob(jobId: string, headers: Record<string, string>) {
+  const deadline = Date.now() + JOB_MAX_WAIT_MS;
+  let retries = 0;
+
+  while (Date.now() < deadline) {
+    try {
+      const res = await axios.get(`${API_URL}/jobs/${jobId}`, { headers });
+      retries = 0;
+      if (res.data.status === 'done') {
+        return res.data.result;
+      }
+      if (res.data.status === 'failed') {
+        throw new Error(res.data.error || 'Scan failed');
+      }
+    } catch (error) {
+      const status = axios.isAxiosError(error) ? error.response?.status : undefined;
+      // A failed job or a 4xx won't change on a retry; network errors and 5xx might
+      if (!axios.isAxiosError(error) || (status !== undefined && status < 500) || retries >= MAX_RETRIES) {
+        throw error;
+      }
+      retries += 1;
+      console.log(`⚠️ Polling job ${jobId} failed, retry ${retries}/${MAX_RETRIES}`);
+      await sleep(1000 * 2 ** (retries - 1));
+      continue;
+    }
+    await sleep(JOB_POLL_INTERVAL_MS);
+  }
+
+  throw new Error(`Scan job ${jobId} did not finish within ${JOB_MAX_WAIT_MS / 60000} minutes`);
+}
+
+async function uploadChunks(
+  uri: string,
+  uploadId: string,
+  totalBytes: number,
+  headers: Record<string, string>,
+  onProgress?: (progress: UploadProgress) => void
+) {
+  // null until the server has told us what it committed; reset after every failure
+  let offset: number | null = null;
+  let retries = 0;
+
+  while (offset === null || offset < totalBytes) {
+    try {
+      if (offset === null) {
+        offset = await getCommittedOffset(uploadId, headers);
+        continue;
+      }
+
+      onProgress?.({ bytesSent: offset, totalBytes });
+
+      const length = Math.min(CHUNK_SIZE, totalBytes - offset);
+      const chunk = await FileSystem.readAsStringAsync(uri, {
+        encoding: FileSystem.EncodingType.Base64,
+        position: offset,
+        length,
+      });
+
+      const res = await axios.put(`${API_URL}/upload/sessions/${uploadId}`, chunk, {
+        params: { offset },
+        headers: {
+          ...headers,
+          'Content-Type': 'application/octet-stream',
+          'X-Chunk-Encoding': 'base64',
+        },
+      });
+      offset = res.data.offset;
+      retries = 0;
+    } catch (error) {
+      const status = axios.isAxiosError(error) ? error.response?.status : undefined;
+      // Offset mismatch: the 409 says where to resume, so it isn't a failure worth a retry
+      const committed = axios.isAxiosError(error) ? error.response?.data?.detail?.offset : undefined;
+      if (status === 409 && typeof committed === 'number') {
+        offset = committed;
+        continue;
+      }
+      // A missing session won't come back; everything else is worth retrying
+      if (status === 404 || retries >= MAX_RETRIES) {
+        throw error;
+      }
+      retries += 1;
+      console.log(`⚠️ Upload request at ${offset ?? 'resume'} failed, retry ${retries}/${MAX_RETRIES}`);
+      await sleep(1000 * 2 ** (retries - 1));
+      // Ask the server what it actually committed before resending
+      offset = null;
+    }
+  }
+
+  onProgress?.({ bytesSent: totalBytes, totalBytes });
+}
+
 export async function uploadApk(
   asset: { uri: string; name: string; type?: string },
-  toolName: string
+  toolName?: string,
+  onProgress?: (progress: UploadProgress) => void
 ) {
   const token = await getToken();
+  const headers = { Authorization: `Bearer ${token}` };
 
-  console.log('📡 Uploading via FileSystem.uploadAsync:', { asset, toolName });
+  console.log('📡 Uploading via resumable session:', { asset, toolName });
 
+  let checksum: string | undefined;
   try {
-    const response = await FileSystem.uploadAsync(
-      `${API_URL}/analyze/tool`, // ✅ uses your dynamic IP from config.js
-      asset.uri,
-      {
-        fieldName: 'file',
-        httpMethod: 'POST',
-        uploadType: FileSystem.FileSystemUploadType.MULTIPART,
-        mimeType: asset.type || 'application/vnd.android.package-archive',
-        parameters: {
-          tool_name: toolName,
-        },
-        headers: {
-          Authorization: `Bearer ${token}`,
-          'Content-Type': 'multipart/form-data',
+    const info = await FileSystem.getInfoAsync(asset.uri, { md5: true });
+    if (!info.exists || !info.md5) {
+      throw new Error(`Cannot read ${asset.name}`);
+    }
+    checksum = info.md5;
+
+    let uploadId = pendingUploads[info.md5];
+    if (!uploadId) {
+      const session = await axios.post(
+        `${API_URL}/upload/sessions`,
+        {
+          filename: asset.name,
+          total_size: info.size,
+          checksum: info.md5,
+          checksum_algorithm: 'md5',
         },
-      }
+        { headers }
+      );
+      uploadId = session.data.upload_id as string;
+      pendingUploads[info.md5] = uploadId;
+    }
+
+    await uploadChunks(asset.uri, uploadId, info.size, headers, onProgress);
+    await axios.post(`${API_URL}/upload/sessions/${uploadId}/finalize`, null, { headers });
+    delete pendingUploads[info.md5];
+
+    const form = new FormData();
+    form.append('upload_id', uploadId);
+    if (toolName) {
+      form.append('tool_name', toolName);
+    }
+    const response = await axios.post(
+      `${API_URL}${toolName ? '/analyze/tool' : '/analyze/comprehensive'}`,
+      form,
+      { headers }
     );
 
-    console.log('✅ Upload result:', response);
-    return JSON.parse(response.body);
+    const data = response.data.job_id ? await waitForJob(response.data.job_id, headers) : response.data;
+
+    console.log('✅ Upload result:', data);
+    return data;
   } catch (error) {
+    // Session expired or was discarded after a checksum mismatch: start fresh next time
+    const status = axios.isAxiosError(error) ? error.response?.status : undefined;
+    if (checksum && (status === 404 || status === 422)) {
+      delete pendingUploads[checksum];
+    }
     console.error('❌ Upload failed:', error);
     throw error;
   }
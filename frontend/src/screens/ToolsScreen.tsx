@@ -6,6 +6,7 @@ import { axiosInstance } from '../api/axiosInstance';
 
 export default function ToolsScreen() {
   const [result, setResult] = useState('');
+  const [progress, setProgress] = useState('');
 
   const tools = [
     'Static Analysis',
@@ -51,11 +52,15 @@ export default function ToolsScreen() {
     console.log('🔗 Using:', uploadAsset);
 
     try {
-      const response = await uploadApk(uploadAsset, toolName);
+      const response = await uploadApk(uploadAsset, toolName, ({ bytesSent, totalBytes }) =>
+        setProgress(`⬆️ Uploading ${Math.round((bytesSent / totalBytes) * 100)}%`)
+      );
       console.log('✅ Response:', response);
       setResult(JSON.stringify(response, null, 2));
     } catch (e) {
       console.log('❌ Upload failed:', e);
+    } finally {
+      setProgress('');
     }
   };
 
@@ -70,6 +75,7 @@ export default function ToolsScreen() {
         </TouchableOpacity>
       ))}
 
+      {progress ? <Text style={styles.result}>{progress}</Text> : null}
       {result ? <Text style={styles.result}>{result}</Text> : null}
     </ScrollView>
   );
@@ -6,6 +6,7 @@ import { uploadApk } from '../api/uploadAPK';
 export default function WholeTestScreen() {
   const [result, setResult] = useState(null);
   const [fileName, setFileName] = useState('');
+  const [progress, setProgress] = useState('');
 
   const handlePickApk = async () => {
     const picked = await DocumentPicker.getDocumentAsync({
@@ -19,11 +20,15 @@ export default function WholeTestScreen() {
       console.log('Picked asset:', asset);
 
       try {
-        const data = await uploadApk(asset);
+        const data = await uploadApk(asset, undefined, ({ bytesSent, totalBytes }) =>
+          setProgress(`⬆️ Uploading ${Math.round((bytesSent / totalBytes) * 100)}%`)
+        );
         setResult(data);
       } catch (err) {
         console.log('❌ Upload failed:', err);
         setResult({ error: err.message });
+      } finally {
+        setProgress('');
       }
     } else {
       setFileName('No file picked');
@@ -37,6 +42,7 @@ export default function WholeTestScreen() {
         <Text style={styles.buttonText}>Pick APK & Start Test</Text>
       </TouchableOpacity>
       {fileName ? <Text style={styles.fileName}>Selected: {fileName}</Text> : null}
+      {progress ? <Text style={styles.fileName}>{progress}</Text> : null}
       {result && (
         <View style={styles.resultBox}>
           <Text style={styles.resultTitle}>🔍 Analysis Result</Text>